@@ -0,0 +1,126 @@
+import os
+import re
+import json
+import time
+import shutil
+import threading
+from typing import Dict, List, Optional
+
+
+def write_json_atomic(path: str, data):
+    # Write to a temp file first so a crash never leaves a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def step_filename(step: str) -> str:
+    """Filesystem-safe name for a step such as 'window:2025-06-01/2025-06-01'."""
+    return re.sub(r'[^A-Za-z0-9]+', '-', step).strip('-') + '.json'
+
+
+class CheckpointJournal:
+    """On-disk journal of completed work for a single generation run.
+
+    Fetched API pages and date windows are stored next to the journal so a
+    resumed run can skip them. Other steps (written sitemap files, uploads)
+    are recorded by name. Without resume, any journal left by a previous run of the same key is
+    discarded.
+    """
+
+    def __init__(self, base_dir: str, run_key: str, resume: bool = False):
+        self.run_key = run_key
+        self.path = os.path.join(base_dir, run_key)
+        self.journal_path = os.path.join(self.path, 'journal.json')
+        # Windows may be fetched from several threads at once
+        self._lock = threading.Lock()
+
+        if not resume:
+            self.cleanup()
+        os.makedirs(self.path, exist_ok=True)
+
+        self.completed: Dict[str, Dict] = {}
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                self.completed = json.load(f).get('completed', {})
+            print(f"Resuming run {run_key}: {len(self.completed)} completed steps found")
+
+    def is_done(self, step: str) -> bool:
+        return step in self.completed
+
+    def get(self, step: str) -> Optional[Dict]:
+        return self.completed.get(step)
+
+    def mark_done(self, step: str, **info):
+        """Record a completed step and flush the journal to disk."""
+        with self._lock:
+            self.completed[step] = info
+            write_json_atomic(self.journal_path, {'run': self.run_key, 'completed': self.completed})
+
+    def _page_path(self, page: int) -> str:
+        return os.path.join(self.path, f"page-{page:04d}.json")
+
+    def load_page(self, page: int) -> Optional[List[Dict]]:
+        """Return the articles of an already fetched page, or None if not fetched yet."""
+        if not self.is_done(f"page:{page}"):
+            return None
+        with open(self._page_path(page), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_page(self, page: int, articles: List[Dict], has_more: Optional[bool] = None):
+        write_json_atomic(self._page_path(page), articles)
+        self.mark_done(f"page:{page}", count=len(articles), has_more=has_more)
+
+    def _result_path(self, step: str) -> str:
+        return os.path.join(self.path, step_filename(step))
+
+    def load_result(self, step: str) -> Optional[List[Dict]]:
+        """Return the articles stored for a completed step (e.g. a date window), or None."""
+        if not self.is_done(step):
+            return None
+        with open(self._result_path(step), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_result(self, step: str, articles: List[Dict]):
+        write_json_atomic(self._result_path(step), articles)
+        self.mark_done(step, count=len(articles))
+
+    def cleanup(self):
+        """Remove the journal and any stored pages."""
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.completed = {}
+
+
+class WindowCache:
+    """Fetched date windows kept across runs, unlike the per-run journal.
+
+    Entries older than ttl_seconds are ignored. With refresh set, existing
+    entries are never read but are still rewritten with the fresh result,
+    e.g. for rebuilds triggered by an article change.
+    """
+
+    def __init__(self, base_dir: str, ttl_seconds: float, refresh: bool = False):
+        self.path = base_dir
+        self.ttl_seconds = ttl_seconds
+        self.refresh = refresh
+        os.makedirs(self.path, exist_ok=True)
+
+    def _window_path(self, step: str) -> str:
+        return os.path.join(self.path, step_filename(step))
+
+    def load(self, step: str) -> Optional[List[Dict]]:
+        """Return the cached articles for a window, or None if missing or expired."""
+        if self.refresh:
+            return None
+        path = self._window_path(step)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, step: str, articles: List[Dict]):
+        write_json_atomic(self._window_path(step), articles)
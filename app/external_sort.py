@@ -0,0 +1,87 @@
+import os
+import sys
+import json
+import heapq
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class ExternalSorter:
+    """Sort (key, record) pairs that may not fit in memory.
+
+    Pairs are buffered as JSON lines until the buffer reaches memory_limit_bytes,
+    then sorted and spilled to a temporary run file. Iterating sorted_items()
+    k-way merges the runs from disk, so peak memory is bounded by the buffer
+    plus one line per run. Keys must be JSON-serializable lists of strings so
+    they compare the same after a round trip through disk.
+    """
+
+    def __init__(self, memory_limit_bytes: int, tmp_dir: Optional[str] = None, reverse: bool = False):
+        self.memory_limit_bytes = memory_limit_bytes
+        self.reverse = reverse
+        self._tmp = tempfile.TemporaryDirectory(prefix='sitemap-sort-', dir=tmp_dir)
+        self._buffer: List[Tuple[List[str], str]] = []
+        self._buffer_bytes = 0
+        self._runs: List[str] = []
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, key: List[str], record: Dict):
+        line = json.dumps([key, record], ensure_ascii=False)
+        item = (key, line)
+        self._buffer.append(item)
+        # Real in-memory cost: non-ASCII text (e.g. Bengali titles) takes 2-4
+        # bytes per character, plus the key strings, containers and list slot
+        self._buffer_bytes += (
+            sys.getsizeof(line) + sys.getsizeof(key) + sum(sys.getsizeof(part) for part in key)
+            + sys.getsizeof(item) + 8
+        )
+        self.count += 1
+        if self._buffer_bytes >= self.memory_limit_bytes:
+            self._spill()
+
+    def _spill(self):
+        if not self._buffer:
+            return
+        self._buffer.sort(key=lambda item: item[0], reverse=self.reverse)
+        path = os.path.join(self._tmp.name, f"run-{len(self._runs):05d}.jsonl")
+        with open(path, 'w', encoding='utf-8') as f:
+            for _, line in self._buffer:
+                f.write(line)
+                f.write('\n')
+        self._runs.append(path)
+        self._buffer = []
+        self._buffer_bytes = 0
+
+    def _read_run(self, path: str) -> Iterator[Tuple[List[str], Dict]]:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                key, record = json.loads(line)
+                yield key, record
+
+    def sorted_items(self) -> Iterator[Tuple[List[str], Dict]]:
+        """Yield every (key, record) pair in key order, consuming the sorter."""
+        if not self._runs:
+            # Everything fit in memory; no need to touch the disk. Items are
+            # popped off the end so each is released as soon as it is consumed,
+            # letting a caller refill another buffer within the same budget.
+            self._buffer.sort(key=lambda item: item[0], reverse=self.reverse)
+            self._buffer.reverse()
+            while self._buffer:
+                key, line = self._buffer.pop()
+                yield key, json.loads(line)[1]
+            return
+
+        self._spill()
+        print(f"Merging {len(self._runs)} sorted runs from disk ({self.count} records)")
+        runs = [self._read_run(path) for path in self._runs]
+        yield from heapq.merge(*runs, key=lambda item: item[0], reverse=self.reverse)
+
+    def close(self):
+        self._buffer = []
+        self._tmp.cleanup()
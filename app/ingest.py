@@ -0,0 +1,228 @@
+import sys
+sys.path.insert(0, '/app')
+
+import hmac
+import json
+import time
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from config import settings
+except ImportError:
+    from app.config import settings
+
+try:
+    from app.sitemap_generator import SitemapGenerator
+except ImportError:
+    from sitemap_generator import SitemapGenerator
+
+EVENT_TYPES = ('article.published', 'article.updated', 'article.deleted')
+LOOPBACK_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+
+class RebuildScheduler:
+    """Coalesce bursts of change events into one rebuild per affected month.
+
+    A rebuild starts once no new event has arrived for debounce_seconds, or at
+    the latest max_delay_seconds after the first pending event, so a steady
+    stream of edits cannot postpone publishing forever. Rebuilds run one at a
+    time on a background thread. A month whose rebuild fails is retried with
+    exponential backoff (debounce_seconds doubled per failure, capped at
+    max_retry_delay_seconds) and given up after max_attempts failures.
+    """
+
+    def __init__(self, rebuild: Callable[[int, int], bool], debounce_seconds: float,
+                 max_delay_seconds: float, max_attempts: int = 5,
+                 max_retry_delay_seconds: float = 600):
+        self.rebuild = rebuild
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.max_attempts = max_attempts
+        self.max_retry_delay_seconds = max_retry_delay_seconds
+        self.pending = set()
+        # Failed months waiting for their backoff to expire: month -> due time
+        self.retries: Dict[Tuple[int, int], float] = {}
+        self.failures: Dict[Tuple[int, int], int] = {}
+        self._first_event_at: Optional[float] = None
+        self._last_event_at: Optional[float] = None
+        self._condition = threading.Condition()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def add(self, year: int, month: int):
+        """Mark a month as changed and (re)start the debounce window."""
+        with self._condition:
+            now = time.monotonic()
+            if not self.pending:
+                self._first_event_at = now
+            self.pending.add((year, month))
+            self._last_event_at = now
+            self._condition.notify()
+
+    def _pending_due_in(self, now: float) -> float:
+        """Seconds until the pending batch should be rebuilt (<= 0 means now)."""
+        quiet_deadline = self._last_event_at + self.debounce_seconds
+        hard_deadline = self._first_event_at + self.max_delay_seconds
+        return min(quiet_deadline, hard_deadline) - now
+
+    def _due_in(self) -> Optional[float]:
+        """Seconds until the next rebuild or retry is due, or None if nothing is queued."""
+        now = time.monotonic()
+        deadlines = [due - now for due in self.retries.values()]
+        if self.pending:
+            deadlines.append(self._pending_due_in(now))
+        return min(deadlines) if deadlines else None
+
+    def _take_due(self) -> List[Tuple[int, int]]:
+        """Remove and return the months whose rebuild is due now."""
+        now = time.monotonic()
+        batch = {month for month, due in self.retries.items() if due <= now}
+        if self.pending and self._pending_due_in(now) <= 0:
+            batch |= self.pending
+            self.pending.clear()
+        for month in batch:
+            self.retries.pop(month, None)
+        return sorted(batch)
+
+    def _record_result(self, year: int, month: int, succeeded: bool):
+        key = (year, month)
+        with self._condition:
+            if succeeded:
+                self.failures.pop(key, None)
+                return
+            failures = self.failures.get(key, 0) + 1
+            if failures >= self.max_attempts:
+                self.failures.pop(key, None)
+                print(f"Rebuild of {year}-{month:02d} failed {failures} times; giving up until the next event")
+                return
+            self.failures[key] = failures
+            delay = min(self.debounce_seconds * 2 ** failures, self.max_retry_delay_seconds)
+            self.retries[key] = time.monotonic() + delay
+            print(f"Rebuild of {year}-{month:02d} failed; retrying in {delay:g}s "
+                  f"(attempt {failures + 1} of {self.max_attempts})")
+
+    def _run(self):
+        while True:
+            with self._condition:
+                wait = self._due_in()
+                while wait is None or wait > 0:
+                    self._condition.wait(wait)
+                    wait = self._due_in()
+                batch = self._take_due()
+
+            print(f"Rebuilding {len(batch)} month(s) after change events: "
+                  f"{', '.join(f'{y}-{m:02d}' for y, m in batch)}")
+            for year, month in batch:
+                try:
+                    succeeded = self.rebuild(year, month)
+                except Exception as e:
+                    print(f"Error rebuilding sitemap for {year}-{month:02d}: {e}")
+                    succeeded = False
+                self._record_result(year, month, succeeded is not False)
+
+
+def get_event_month(event: Dict) -> Optional[Tuple[int, int]]:
+    """Return the (year, month) whose sitemap an event affects, or None if unknown.
+    
+    Article dates are converted to Asia/Dhaka first, the zone the sitemaps
+    are rendered in, so e.g. 2025-06-30T20:00:00Z counts towards July.
+    """
+    if event.get('month'):
+        try:
+            dt = datetime.strptime(str(event['month'])[:7], '%Y-%m')
+        except ValueError:
+            return None
+        return dt.year, dt.month
+
+    article = event.get('article')
+    if not isinstance(article, dict):
+        return None
+    value = article.get('published_at') or article.get('created_at')
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        dt = SitemapGenerator().parse_datetime(value)
+    except (ValueError, AttributeError):
+        return None
+    return dt.year, dt.month
+
+
+class IngestHandler(BaseHTTPRequestHandler):
+    """Accept CMS article events on POST /events and queue the affected months."""
+
+    scheduler: RebuildScheduler = None
+
+    def _respond(self, status: int, body: Dict):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/events':
+            self._respond(404, {'error': 'not found'})
+            return
+
+        if settings.INGEST_TOKEN and not hmac.compare_digest(
+            self.headers.get('Authorization', '').encode('utf-8'),
+            f"Bearer {settings.INGEST_TOKEN}".encode('utf-8')
+        ):
+            self._respond(401, {'error': 'unauthorized'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            data = json.loads(self.rfile.read(length) or b'null')
+        except (ValueError, json.JSONDecodeError):
+            self._respond(400, {'error': 'invalid JSON'})
+            return
+
+        # Accept a single event or a list of events
+        events = data if isinstance(data, list) else [data]
+        months = set()
+        for event in events:
+            if not isinstance(event, dict) or event.get('event') not in EVENT_TYPES:
+                self._respond(400, {'error': f"event must be one of {', '.join(EVENT_TYPES)}"})
+                return
+            event_month = get_event_month(event)
+            if event_month is None:
+                self._respond(400, {'error': 'event needs an article object with published_at, or month (YYYY-MM)'})
+                return
+            months.add(event_month)
+
+        for year, month in months:
+            self.scheduler.add(year, month)
+        self._respond(202, {'queued': sorted(f"{y}-{m:02d}" for y, m in months)})
+
+    def log_message(self, format, *args):
+        print(f"Ingest {self.address_string()} - {format % args}")
+
+
+def serve(rebuild: Callable[[int, int], bool]):
+    """Run the ingest endpoint until interrupted."""
+    if not settings.INGEST_TOKEN and settings.INGEST_HOST not in LOOPBACK_HOSTS:
+        print(f"Error: Refusing to listen on {settings.INGEST_HOST} without INGEST_TOKEN; "
+              f"set a token or bind to 127.0.0.1")
+        sys.exit(1)
+    
+    scheduler = RebuildScheduler(
+        rebuild,
+        debounce_seconds=settings.INGEST_DEBOUNCE_SECONDS,
+        max_delay_seconds=settings.INGEST_MAX_DELAY_SECONDS,
+        max_attempts=settings.INGEST_MAX_ATTEMPTS,
+        max_retry_delay_seconds=settings.INGEST_RETRY_MAX_DELAY_SECONDS
+    )
+    handler = type('BoundIngestHandler', (IngestHandler,), {'scheduler': scheduler})
+    server = ThreadingHTTPServer((settings.INGEST_HOST, settings.INGEST_PORT), handler)
+    print(f"Listening for CMS events on http://{settings.INGEST_HOST}:{settings.INGEST_PORT}/events")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping ingest server")
+    finally:
+        server.server_close()
@@ -6,15 +6,227 @@ from datetime import datetime, timedelta
 sys.path.insert(0, '/app')
 
 try:
-    from app.sitemap_generator import SitemapGenerator
+    from app.sitemap_generator import SitemapGenerator, FETCH_WINDOWS
     from app.r2_uploader import R2Uploader
+    from app.profiling import RunProfiler
+    from app.checkpoint import CheckpointJournal, WindowCache
+    from app import ingest
     from config import settings
 except ImportError:
     # Fallback for direct execution
-    from sitemap_generator import SitemapGenerator
+    from sitemap_generator import SitemapGenerator, FETCH_WINDOWS
     from r2_uploader import R2Uploader
+    from profiling import RunProfiler
+    from checkpoint import CheckpointJournal, WindowCache
+    import ingest
     from config import settings
 
+# Optional flags that may appear anywhere on the command line
+OPTION_FLAGS = ('--profile', '--resume', '--by-category', '--parallel', '--windowed',
+                '--external-sort')
+
+def run_sync(missing_vars):
+    """Reconcile the bucket's sitemap folder with the local sitemaps directory."""
+    if missing_vars:
+        print(f"Error: Cannot sync without R2 credentials: {', '.join(missing_vars)}")
+        sys.exit(1)
+    
+    if not os.path.isdir(settings.SITEMAP_LOCAL_DIR):
+        print(f"Error: Local sitemap directory does not exist: {settings.SITEMAP_LOCAL_DIR}")
+        sys.exit(1)
+    
+    uploader = R2Uploader()
+    summary = uploader.sync_folder(settings.SITEMAP_LOCAL_DIR, delete_orphans=settings.SYNC_DELETE_ORPHANS)
+    if summary['failed'] or summary['delete_failed']:
+        sys.exit(1)
+
+def get_index_loc(filename):
+    """Public URL of an uploaded sitemap, for <loc> in the sitemap index."""
+    return f"{settings.SITEMAP_BASE_URL.rstrip('/')}/{R2Uploader.get_object_key(filename)}"
+
+def get_category_filename(category, year, month, used):
+    """Filename for a category's sitemap that never overwrites another output file.
+    
+    used holds the filenames already taken this run. A category whose name collides (e.g. 'index') gets a '-category' suffix;
+    if that is taken as well, generation fails instead of dropping URLs.
+    """
+    reserved = {
+        settings.SITEMAP_INDEX_FILENAME.format(year=year, month=month),
+        settings.SITEMAP_FILENAME.format(year=year, month=month),
+    }
+    filename = settings.CATEGORY_SITEMAP_FILENAME.format(category=category, year=year, month=month)
+    if filename in reserved:
+        renamed = settings.CATEGORY_SITEMAP_FILENAME.format(
+            category=f"{category}-category", year=year, month=month
+        )
+        print(f"Category {category!r} would overwrite {filename}; writing {renamed} instead")
+        filename = renamed
+    if filename in reserved or filename in used:
+        raise ValueError(f"Category {category!r} maps to {filename}, which is already in use; "
+                         f"check CATEGORY_SITEMAP_FILENAME")
+    return filename
+
+def generate_outputs(generator, year, month, by_category):
+    """Generate the sitemap files for a month as a mapping of filename -> content."""
+    if not by_category:
+        filename = settings.SITEMAP_FILENAME.format(year=year, month=month)
+        return {filename: generator.generate_monthly_sitemap(year, month)}
+    
+    outputs = {}
+    index_entries = []
+    for category, result in generator.generate_monthly_category_sitemaps(year, month).items():
+        filename = get_category_filename(category, year, month, outputs)
+        outputs[filename] = result['content']
+        index_entries.append((get_index_loc(filename), result['lastmod']))
+    
+    # The index goes last so it is only published after the files it points to
+    index_filename = settings.SITEMAP_INDEX_FILENAME.format(year=year, month=month)
+    outputs[index_filename] = generator.generate_sitemap_index(index_entries)
+    return outputs
+
+def write_outputs_external(generator, year, month, by_category):
+    """Write a month's sitemap files straight to disk with the external sort. Returns the filenames."""
+    if not by_category:
+        filename = settings.SITEMAP_FILENAME.format(year=year, month=month)
+        generator.write_monthly_sitemap_external(
+            year, month, os.path.join(settings.SITEMAP_LOCAL_DIR, filename)
+        )
+        return [filename]
+    
+    used = set()
+    def path_for(category):
+        filename = get_category_filename(category, year, month, used)
+        used.add(filename)
+        return os.path.join(settings.SITEMAP_LOCAL_DIR, filename)
+    
+    filenames = []
+    index_entries = []
+    for result in generator.write_monthly_category_sitemaps_external(year, month, path_for).values():
+        filename = os.path.basename(result['path'])
+        filenames.append(filename)
+        index_entries.append((get_index_loc(filename), result['lastmod']))
+    
+    # The index goes last so it is only published after the files it points to
+    index_filename = settings.SITEMAP_INDEX_FILENAME.format(year=year, month=month)
+    with open(os.path.join(settings.SITEMAP_LOCAL_DIR, index_filename), 'wb') as f:
+        f.write(generator.generate_sitemap_index(index_entries))
+    filenames.append(index_filename)
+    return filenames
+
+def run_month(year, month, flags, missing_vars, require_upload=False, refresh_windows=False):
+    """Generate, save and upload the sitemaps for one month.
+    
+    Returns False if generation failed. Upload failures are reported but the
+    locally saved sitemaps still count as a successful run, unless
+    require_upload is set (event-driven rebuilds, which are retried).
+    refresh_windows refetches windows held in the window cache.
+    """
+    # Profiling is opt-in; a disabled profiler turns every stage into a no-op
+    profiler = RunProfiler(
+        settings.PROFILE_DIR,
+        run_name=f"{year}-{month:02d}-{datetime.now().strftime('%Y%m%dT%H%M%S')}",
+        enabled='--profile' in flags,
+        top_n=settings.PROFILE_TOP_N
+    )
+    
+    try:
+        # Journal completed pages, files and uploads so a failed run can be resumed
+        checkpoint = CheckpointJournal(
+            settings.CHECKPOINT_DIR,
+            run_key=f"{year}-{month:02d}",
+            resume='--resume' in flags
+        )
+    
+        # Files from a resumed run are only reused if they were written in the same mode
+        output_mode = 'category' if '--by-category' in flags else 'monthly'
+        previous_outputs = checkpoint.get('outputs')
+        if previous_outputs and previous_outputs.get('mode') == output_mode and all(
+            os.path.exists(os.path.join(settings.SITEMAP_LOCAL_DIR, name)) for name in previous_outputs['files']
+        ):
+            filenames = previous_outputs['files']
+            print(f"Sitemaps already generated in previous run: {', '.join(filenames)}")
+        else:
+            window_cache = None
+            if '--windowed' in flags and settings.WINDOW_CACHE_TTL_SECONDS > 0:
+                window_cache = WindowCache(
+                    settings.WINDOW_CACHE_DIR,
+                    ttl_seconds=settings.WINDOW_CACHE_TTL_SECONDS,
+                    refresh=refresh_windows
+                )
+            
+            # Generate sitemap
+            generator = SitemapGenerator(
+                profiler=profiler,
+                checkpoint=checkpoint,
+                parallel='--parallel' in flags,
+                fetch_window=settings.FETCH_WINDOW if '--windowed' in flags else None,
+                window_cache=window_cache
+            )
+            try:
+                if '--external-sort' in flags:
+                    filenames = write_outputs_external(generator, year, month, '--by-category' in flags)
+                    for filename in filenames:
+                        print(f"Sitemap saved locally: {os.path.join(settings.SITEMAP_LOCAL_DIR, filename)}")
+                else:
+                    outputs = generate_outputs(generator, year, month, '--by-category' in flags)
+                
+                    # Save locally
+                    for filename, sitemap_content in outputs.items():
+                        local_path = os.path.join(settings.SITEMAP_LOCAL_DIR, filename)
+                        with open(local_path, 'wb') as f:
+                            f.write(sitemap_content)
+                        print(f"Sitemap saved locally: {local_path}")
+                    filenames = list(outputs)
+                    # Uploads stream from disk, so the documents need not stay in memory
+                    del outputs
+            except Exception as e:
+                print(f"Error generating sitemap: {e}")
+                print("Progress was checkpointed; rerun with --resume to continue")
+                return False
+            checkpoint.mark_done('outputs', files=filenames, mode=output_mode)
+    
+        # Upload to R2 only if credentials are available
+        pending = [name for name in filenames if not checkpoint.is_done(f"upload:{name}")]
+        completed = False
+        if not pending:
+            print("Sitemaps already uploaded in previous run")
+            completed = True
+        elif not missing_vars:
+            try:
+                uploader = R2Uploader()
+            
+                # Create folder if it doesn't exist (optional - R2 creates folders automatically on upload)
+                if settings.SITEMAP_FOLDER:
+                    uploader.create_folder(settings.SITEMAP_FOLDER)
+            
+                failed = []
+                with profiler.stage('upload'):
+                    for filename in pending:
+                        local_path = os.path.join(settings.SITEMAP_LOCAL_DIR, filename)
+                        if uploader.upload_sitemap_file(local_path, filename):
+                            checkpoint.mark_done(f"upload:{filename}")
+                        else:
+                            failed.append(filename)
+                if not failed:
+                    completed = True
+                    print("Sitemap generation and upload completed successfully!")
+                else:
+                    print(f"Sitemap generation completed but upload to R2 failed for: {', '.join(failed)}")
+            except Exception as e:
+                print(f"Error during R2 upload: {e}")
+                print("Sitemap was generated locally but not uploaded to R2")
+        else:
+            completed = True
+            print("Sitemap generated locally (R2 upload skipped due to missing credentials)")
+    
+        if completed:
+            checkpoint.cleanup()
+        else:
+            print("Rerun with --resume to retry the upload without regenerating the sitemap")
+        return completed or not require_upload
+    finally:
+        profiler.print_summary()
+
 def main():
     # Check if environment variables are set
     required_env_vars = ['R2_ACCESS_KEY_ID', 'R2_SECRET_ACCESS_KEY', 'R2_BUCKET_NAME']
@@ -24,20 +236,51 @@ def main():
         print(f"Warning: Missing R2 environment variables: {', '.join(missing_vars)}")
         print("Sitemap will be generated locally but not uploaded to R2")
     
+    # Separate optional flags from positional arguments
+    flags = {arg for arg in sys.argv[1:] if arg in OPTION_FLAGS}
+    args = [arg for arg in sys.argv[1:] if arg not in OPTION_FLAGS]
+    
+    if '--windowed' in flags and settings.FETCH_WINDOW not in FETCH_WINDOWS:
+        print(f"Error: FETCH_WINDOW must be one of {', '.join(FETCH_WINDOWS)}, got {settings.FETCH_WINDOW!r}")
+        sys.exit(1)
+    
+    if '--external-sort' in flags and '--parallel' in flags:
+        print("Error: --parallel cannot be combined with --external-sort, which streams records to disk")
+        sys.exit(1)
+    
+    if '--by-category' in flags and not settings.SITEMAP_BASE_URL:
+        print("Error: --by-category needs SITEMAP_BASE_URL, the public URL the bucket is served from, "
+              "to build the sitemap index")
+        sys.exit(1)
+    
+    if args and args[0] == 'sync':
+        run_sync(missing_vars)
+        return
+    
+    if args and args[0] == 'serve':
+        # Rebuild only the months touched by CMS events, with the same flags as a
+        # normal run except --resume: a rebuild must fetch the data the event changed,
+        # so cached windows are refetched too
+        rebuild_flags = flags - {'--resume'}
+        ingest.serve(lambda year, month: run_month(
+            year, month, rebuild_flags, missing_vars, require_upload=True, refresh_windows=True
+        ))
+        return
+    
     # Determine date range
     now = datetime.now()
     
     # If running manually, use command line arguments or default to current month
-    if len(sys.argv) > 1:
-        if sys.argv[1] == '--current-month':
+    if args:
+        if args[0] == '--current-month':
             year = now.year
             month = now.month
-        elif len(sys.argv) >= 3:
+        elif len(args) >= 2:
             try:
-                year = int(sys.argv[1])
-                month = int(sys.argv[2])
+                year = int(args[0])
+                month = int(args[1])
             except ValueError:
-                print("Usage: python main.py [year month] | [--current-month]")
+                print("Usage: python main.py [year month] | [--current-month] | [sync] | [serve] [--profile] [--resume] [--by-category] [--parallel] [--windowed] [--external-sort]")
                 sys.exit(1)
         else:
             # Default to previous month for scheduled runs
@@ -50,36 +293,8 @@ def main():
         year = now.year
         month = now.month
     
-    # Generate sitemap
-    generator = SitemapGenerator()
-    sitemap_content = generator.generate_monthly_sitemap(year, month)
-    
-    # Save locally
-    filename = settings.SITEMAP_FILENAME.format(year=year, month=month)
-    local_path = f"/app/sitemaps/{filename}"
-    
-    with open(local_path, 'wb') as f:
-        f.write(sitemap_content)
-    print(f"Sitemap saved locally: {local_path}")
-    
-    # Upload to R2 only if credentials are available
-    if not missing_vars:
-        try:
-            uploader = R2Uploader()
-            
-            # Create folder if it doesn't exist (optional - R2 creates folders automatically on upload)
-            if settings.SITEMAP_FOLDER:
-                uploader.create_folder(settings.SITEMAP_FOLDER)
-            
-            if uploader.upload_sitemap(sitemap_content, filename):
-                print("Sitemap generation and upload completed successfully!")
-            else:
-                print("Sitemap generation completed but upload to R2 failed!")
-        except Exception as e:
-            print(f"Error during R2 upload: {e}")
-            print("Sitemap was generated locally but not uploaded to R2")
-    else:
-        print("Sitemap generated locally (R2 upload skipped due to missing credentials)")
+    if not run_month(year, month, flags, missing_vars):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
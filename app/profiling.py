@@ -0,0 +1,98 @@
+import os
+import io
+import time
+import cProfile
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List
+
+
+class RunProfiler:
+    """Profile a generation run stage by stage with cProfile and tracemalloc.
+
+    Each stage writes a pstats file and a top-N allocation report into
+    output_dir. When disabled, stage() is a no-op so callers can wrap their
+    code unconditionally.
+    """
+
+    def __init__(self, output_dir: str, run_name: str, enabled: bool = True, top_n: int = 15):
+        self.output_dir = output_dir
+        self.run_name = run_name
+        self.enabled = enabled
+        self.top_n = top_n
+        self.results: List[Dict] = []
+        self._active = False
+        self._stage_counts: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Profile the wrapped block as a named stage. Nested stages are not profiled separately."""
+        if not self.enabled or self._active:
+            yield
+            return
+
+        self._active = True
+        profiler = cProfile.Profile()
+        tracemalloc.start()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - started
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self._active = False
+            self._save_stage(name, profiler, snapshot, elapsed, peak)
+
+    def _save_stage(self, name: str, profiler: cProfile.Profile, snapshot, elapsed: float, peak: int):
+        # Stages that run more than once (e.g. one serialize per file) get numbered
+        count = self._stage_counts.get(name, 0) + 1
+        self._stage_counts[name] = count
+        if count > 1:
+            name = f"{name}-{count}"
+        
+        os.makedirs(self.output_dir, exist_ok=True)
+        prefix = os.path.join(self.output_dir, f"{self.run_name}-{name}")
+
+        stats_path = f"{prefix}.pstats"
+        profiler.dump_stats(stats_path)
+
+        alloc_path = f"{prefix}-alloc.txt"
+        top_stats = snapshot.statistics('lineno')[:self.top_n]
+        with open(alloc_path, 'w') as f:
+            f.write(f"Stage: {name}\n")
+            f.write(f"Peak traced memory: {peak / 1024 / 1024:.2f} MiB\n\n")
+            for stat in top_stats:
+                f.write(f"{stat}\n")
+
+        self.results.append({
+            'stage': name,
+            'seconds': elapsed,
+            'peak_bytes': peak,
+            'stats': pstats.Stats(profiler),
+            'stats_path': stats_path,
+            'alloc_path': alloc_path,
+        })
+
+    def print_summary(self, hotspots: int = 5):
+        """Print wall time, peak memory and the top functions by own time for each stage."""
+        if not self.results:
+            return
+
+        print(f"\nProfile summary ({self.run_name}), written to {self.output_dir}:")
+        for result in self.results:
+            print(f"  [{result['stage']}] {result['seconds']:.3f}s, "
+                  f"peak {result['peak_bytes'] / 1024 / 1024:.2f} MiB")
+
+            # pstats only prints to a stream, so capture the table and keep the rows
+            stream = io.StringIO()
+            result['stats'].stream = stream
+            result['stats'].sort_stats('tottime').print_stats(hotspots)
+            rows = [line for line in stream.getvalue().splitlines()
+                    if line.strip()[:1].isdigit() and 'function calls' not in line]
+            for row in rows[:hotspots]:
+                print(f"      {row.strip()}")
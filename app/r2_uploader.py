@@ -1,6 +1,11 @@
 import sys
 sys.path.insert(0, '/app')
 
+import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, List, Tuple, Union
+
 import boto3
 from botocore.exceptions import ClientError, EndpointConnectionError
 
@@ -26,16 +31,26 @@ class R2Uploader:
             print(f"Error initializing R2 client: {e}")
             raise
     
-    def upload_sitemap(self, sitemap_content: bytes, filename: str) -> bool:
-        """Upload sitemap to R2 bucket in specified folder."""
+    @staticmethod
+    def get_folder_prefix() -> str:
+        """Return the bucket prefix sitemaps live under ('' for the bucket root)."""
+        if settings.SITEMAP_FOLDER:
+            # Ensure folder ends with slash
+            return settings.SITEMAP_FOLDER.rstrip('/') + '/'
+        return ''
+    
+    @staticmethod
+    def get_object_key(filename: str) -> str:
+        """Construct the full object key for a sitemap filename, including folder."""
+        return f"{R2Uploader.get_folder_prefix()}{filename}"
+    
+    def upload_sitemap(self, sitemap_content: Union[bytes, BinaryIO], filename: str) -> bool:
+        """Upload sitemap to R2 bucket in specified folder.
+        
+        sitemap_content may be bytes or an open binary file, which is streamed.
+        """
         try:
-            # Construct the full path with folder
-            if settings.SITEMAP_FOLDER:
-                # Ensure folder ends with slash
-                folder = settings.SITEMAP_FOLDER.rstrip('/') + '/'
-                key = f"{folder}{filename}"
-            else:
-                key = filename
+            key = self.get_object_key(filename)
             
             print(f"Attempting to upload to R2: {self.bucket_name}/{key}")
             
@@ -75,3 +90,120 @@ class R2Uploader:
         except ClientError as e:
             print(f"Error creating folder in R2: {e}")
             return False
+    
+    def list_remote_sitemaps(self) -> Dict[str, Dict]:
+        """List sitemap objects under the folder prefix using paginated list_objects_v2.
+        
+        Returns a mapping of filename -> {'key', 'size', 'etag'}. Only .xml
+        objects directly under the prefix are returned; the folder marker,
+        other files and anything in nested "subfolders" are ignored.
+        """
+        prefix = self.get_folder_prefix()
+        remote = {}
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                name = obj['Key'][len(prefix):]
+                if not name.endswith('.xml') or '/' in name:
+                    continue
+                remote[name] = {
+                    'key': obj['Key'],
+                    'size': obj['Size'],
+                    'etag': obj.get('ETag', '').strip('"'),
+                }
+        return remote
+    
+    def _file_md5(self, path: str) -> str:
+        """Return the hex MD5 of a local file, read in chunks."""
+        digest = hashlib.md5()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def _needs_upload(self, path: str, remote_obj: Dict) -> bool:
+        """Decide whether a local file differs from its remote copy."""
+        if remote_obj is None:
+            return True
+        if os.path.getsize(path) != remote_obj['size']:
+            return True
+        # Multipart uploads have a composite ETag ("<md5>-<parts>") that is not the
+        # file's MD5, so size is the only cheap comparison available for those.
+        if '-' in remote_obj['etag']:
+            return False
+        return self._file_md5(path) != remote_obj['etag']
+    
+    def upload_sitemap_file(self, path: str, filename: str) -> bool:
+        """Upload a local sitemap file, streaming it rather than reading it into memory."""
+        with open(path, 'rb') as f:
+            return self.upload_sitemap(f, filename)
+    
+    def delete_sitemaps(self, keys: List[str]) -> Tuple[int, int]:
+        """Delete objects in batches of 1000 (the delete_objects limit).
+        
+        Returns the number of objects deleted and the number that failed.
+        """
+        deleted = failed = 0
+        for i in range(0, len(keys), 1000):
+            batch = keys[i:i + 1000]
+            try:
+                response = self.s3_client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+                )
+            except (ClientError, EndpointConnectionError) as e:
+                print(f"Error deleting objects from R2: {e}")
+                failed += len(batch)
+                continue
+            errors = response.get('Errors', [])
+            for error in errors:
+                print(f"Failed to delete {error.get('Key')}: {error.get('Message')}")
+            deleted += len(batch) - len(errors)
+            failed += len(errors)
+        return deleted, failed
+    
+    def sync_folder(self, local_dir: str, delete_orphans: bool = True) -> Dict[str, int]:
+        """Reconcile the bucket folder with the local sitemap directory.
+        
+        Uploads sitemaps that are missing remotely or differ in size/checksum,
+        and removes remote sitemaps that no longer exist locally.
+        """
+        local_files = {
+            name: os.path.join(local_dir, name)
+            for name in sorted(os.listdir(local_dir))
+            if name.endswith('.xml') and os.path.isfile(os.path.join(local_dir, name))
+        }
+        remote = self.list_remote_sitemaps()
+        print(f"Sync: {len(local_files)} local sitemaps, {len(remote)} remote objects")
+        
+        to_upload = [
+            (path, name) for name, path in local_files.items()
+            if self._needs_upload(path, remote.get(name))
+        ]
+        orphans = [obj['key'] for name, obj in remote.items() if name not in local_files]
+        
+        uploaded = failed = 0
+        if to_upload:
+            with ThreadPoolExecutor(max_workers=settings.SYNC_WORKERS) as executor:
+                results = list(executor.map(lambda item: self.upload_sitemap_file(*item), to_upload))
+            uploaded = sum(results)
+            failed = len(results) - uploaded
+        
+        deleted = delete_failed = 0
+        if delete_orphans and orphans:
+            if local_files:
+                deleted, delete_failed = self.delete_sitemaps(orphans)
+            else:
+                # An empty local directory (e.g. a missing volume) would otherwise
+                # wipe every published sitemap
+                print(f"Refusing to delete {len(orphans)} remote sitemaps: no local sitemaps found in {local_dir}")
+        
+        summary = {
+            'uploaded': uploaded,
+            'failed': failed,
+            'unchanged': len(local_files) - len(to_upload),
+            'deleted': deleted,
+            'delete_failed': delete_failed,
+        }
+        print(f"Sync complete: {summary}")
+        return summary
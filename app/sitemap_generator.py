@@ -1,24 +1,60 @@
+import os
 import sys
 sys.path.insert(0, '/app')
 
+import re
+import heapq
 import requests
 import xml.etree.ElementTree as ET
 from xml.dom import minidom
 from datetime import datetime, timedelta
+from contextlib import ExitStack, nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import pytz
-from typing import List, Dict, Optional
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
 
 try:
     from config import settings
 except ImportError:
     from app.config import settings
 
+try:
+    from app.external_sort import ExternalSorter
+except ImportError:
+    from external_sort import ExternalSorter
+
+FETCH_WINDOWS = ('day', 'hour')
+
+# Article fields read by build_url_element; external sort spills only these
+COMPACT_FIELDS = (
+    'id', 'title', 'category_slug', 'category', 'subcategory_slug', 'subcategories',
+    'url_slug', 'slug', 'last_published_at', 'updated_at', 'created_at', 'published_at',
+    'image_url', 'featured_image', 'thumbnail', 'image_caption'
+)
+
 # ... rest of your existing sitemap_generator code ...
 # ... rest of your sitemap_generator code ...
 class SitemapGenerator:
-    def __init__(self):
+    def __init__(self, profiler=None, checkpoint=None, parallel: bool = False,
+                 fetch_window: Optional[str] = None, window_cache=None):
         self.base_url = settings.SITE_BASE_URL
         self.api_url = settings.API_BASE_URL
+        # Optional RunProfiler; stages are only recorded when one is attached
+        self.profiler = profiler
+        # Optional CheckpointJournal; fetched pages are reused on resume
+        self.checkpoint = checkpoint
+        # Render <url> elements in a process pool for large article sets
+        self.parallel = parallel
+        # 'day' or 'hour' to fetch the range as concurrent date windows
+        self.fetch_window = fetch_window
+        # Optional WindowCache; closed windows are reused across runs
+        self.window_cache = window_cache
+    
+    def stage(self, name: str):
+        """Context manager marking a profiled stage (no-op without a profiler)."""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.stage(name)
         
     def prettify_xml(self, elem):
         """Return a pretty-printed XML string for the Element."""
@@ -26,8 +62,13 @@ class SitemapGenerator:
         reparsed = minidom.parseString(rough_string)
         return reparsed.toprettyxml(indent="  ", encoding='utf-8')
     
-    def get_articles(self, from_date: str, to_date: str, page: int = 1, page_size: int = 5000) -> List[Dict]:
-        """Fetch articles from the API with date filtering."""
+    def get_articles_page(self, from_date: str, to_date: str, page: int,
+                          page_size: int) -> Tuple[List[Dict], Optional[bool]]:
+        """Fetch one page of articles; request errors are raised.
+        
+        Returns the articles and whether another page exists, taken from the
+        response's 'next' link when the API provides one (None if unknown).
+        """
         params = {
             'from_date': from_date,
             'to_date': to_date,
@@ -35,30 +76,202 @@ class SitemapGenerator:
             'page_size': page_size
         }
         
-        try:
-            response = requests.get(self.api_url, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
+        response = requests.get(self.api_url, params=params, timeout=30)
+        response.raise_for_status()
+        data = response.json()
+        
+        # Adjust this based on your API response structure
+        if isinstance(data, dict) and ('results' in data or 'data' in data):
+            articles = data['results'] if 'results' in data else data['data']
+            has_more = bool(data['next']) if 'next' in data else None
+            return articles, has_more
+        elif isinstance(data, list):
+            return data, None
+        else:
+            print(f"Unexpected API response structure: {data}")
+            return [], None
+    
+    def fetch_articles(self, from_date: str, to_date: str, page_size: int = None,
+                       use_checkpoint: bool = True) -> List[Dict]:
+        """Fetch every page of articles for the date range.
+        
+        Pages already recorded in the checkpoint journal are loaded from disk
+        instead of being requested again (see iter_article_pages).
+        """
+        articles = []
+        seen_ids = set()
+        
+        for batch in self.iter_article_pages(from_date, to_date, page_size, use_checkpoint):
+            new_articles = [a for a in batch if a.get('id') is None or a.get('id') not in seen_ids]
+            # Stop if the API cycles through pages it already returned
+            if not new_articles:
+                break
+            seen_ids.update(a.get('id') for a in new_articles)
+            articles.extend(new_articles)
+        
+        return articles
+    
+    def iter_article_pages(self, from_date: str, to_date: str, page_size: int = None,
+                           use_checkpoint: bool = True) -> Iterator[List[Dict]]:
+        """Yield the date range one API page at a time.
+        
+        Paging follows the response's 'next' link when present. Otherwise it
+        continues until an empty page, or a 404 past the first page, because
+        the API may cap page_size below what was requested. API errors are
+        raised rather than swallowed so a failed run can be resumed instead of
+        publishing a truncated sitemap. Paging also stops when a page repeats
+        the previous one, as happens when the API ignores the page parameter.
+        """
+        page_size = page_size or settings.PAGE_SIZE
+        checkpoint = self.checkpoint if use_checkpoint else None
+        page = 1
+        previous_batch = None
+        
+        while True:
+            batch = checkpoint.load_page(page) if checkpoint else None
+            if batch is None:
+                try:
+                    batch, has_more = self.get_articles_page(from_date, to_date, page, page_size)
+                except requests.exceptions.RequestException as e:
+                    response = getattr(e, 'response', None)
+                    # DRF-style APIs answer 404 for a page past the end
+                    if page > 1 and response is not None and response.status_code == 404:
+                        break
+                    print(f"Error fetching articles from API: {e}")
+                    raise
+                if checkpoint:
+                    checkpoint.save_page(page, batch, has_more=has_more)
+            else:
+                has_more = checkpoint.get(f"page:{page}").get('has_more')
+                print(f"Loaded page {page} from checkpoint ({len(batch)} articles)")
             
-            # Adjust this based on your API response structure
-            if isinstance(data, dict) and 'results' in data:
-                return data['results']
-            elif isinstance(data, dict) and 'data' in data:
-                return data['data']
-            elif isinstance(data, list):
-                return data
+            if not batch:
+                break
+            if batch == previous_batch:
+                print(f"Page {page} repeats page {page - 1}; the API ignores paging, stopping")
+                break
+            previous_batch = batch
+            yield batch
+            
+            if has_more is False:
+                break
+            page += 1
+    
+    def get_category_key(self, article: Dict) -> str:
+        """Category used to route an article to its own sitemap file.
+        
+        The slug becomes part of a local path and object key, so anything
+        outside [a-z0-9-] is routed to 'news'.
+        """
+        category_slug = self.get_category_slug(article)
+        if isinstance(category_slug, str) and re.fullmatch(r'[a-z0-9-]+', category_slug):
+            return category_slug
+        return 'news'
+    
+    def get_category_slug(self, article: Dict) -> str:
+        """Get the article's category slug, defaulting to 'news'."""
+        return article.get('category_slug') or article.get('category', {}).get('slug', 'news')
+    
+    def fetch_range(self, from_date: str, to_date: str) -> List[Dict]:
+        """Fetch all articles for the range, windowed if a fetch window is configured."""
+        if self.fetch_window:
+            return self.fetch_windowed(from_date, to_date)
+        return self.fetch_articles(from_date, to_date)
+    
+    def get_windows(self, from_date: str, to_date: str) -> List[Tuple[str, str]]:
+        """Split an inclusive date range into (from, to) day or hour windows.
+        
+        Hour windows run from the start of one hour to the start of the next so
+        fractional seconds never fall between windows. An article exactly on a
+        boundary may come back from both windows and is de-duplicated by id.
+        """
+        if self.fetch_window not in FETCH_WINDOWS:
+            raise ValueError(f"Unknown fetch window {self.fetch_window!r}; expected one of {', '.join(FETCH_WINDOWS)}")
+        start = datetime.strptime(from_date, '%Y-%m-%d')
+        end = datetime.strptime(to_date, '%Y-%m-%d')
+        windows = []
+        day = start
+        while day <= end:
+            if self.fetch_window == 'hour':
+                for hour in range(24):
+                    window_start = day + timedelta(hours=hour)
+                    windows.append((
+                        window_start.strftime('%Y-%m-%dT%H:00:00'),
+                        (window_start + timedelta(hours=1)).strftime('%Y-%m-%dT%H:00:00')
+                    ))
             else:
-                print(f"Unexpected API response structure: {data}")
-                return []
-                
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching articles from API: {e}")
-            return []
+                windows.append((day.strftime('%Y-%m-%d'), day.strftime('%Y-%m-%d')))
+            day += timedelta(days=1)
+        return windows
+    
+    def publication_sort_key(self, article: Dict) -> Tuple[str, str]:
+        """Sort key by publication date; dates share one timezone so they sort as strings.
+        
+        Missing or unparseable dates get the fixed key '' (oldest) rather than
+        format_datetime's current-time fallback, which keeps the order stable.
+        """
+        pub_date = article.get('published_at') or article.get('created_at')
+        try:
+            sort_date = self.parse_datetime(pub_date).strftime('%Y-%m-%dT%H:%M:%S.%f') if pub_date else ''
+        except (ValueError, AttributeError, TypeError):
+            sort_date = ''
+        return (sort_date, str(article.get('id', '')))
+    
+    def is_closed_window(self, window: Tuple[str, str]) -> bool:
+        """Whether a window ended before yesterday (UTC), so no new articles can land in it.
+        
+        The day of margin covers any timezone the API may filter dates in.
+        """
+        cutoff = (datetime.now(pytz.utc) - timedelta(days=1)).strftime('%Y-%m-%d')
+        return window[1][:10] < cutoff
+    
+    def fetch_window_articles(self, window: Tuple[str, str]) -> List[Dict]:
+        """Fetch one date window, newest first.
+        
+        The whole window is cached in the checkpoint for --resume and, if it is
+        closed, in the window cache so later runs can skip it too.
+        """
+        step = f"window:{window[0]}/{window[1]}"
+        cache = self.window_cache if self.window_cache and self.is_closed_window(window) else None
+        articles = self.checkpoint.load_result(step) if self.checkpoint else None
+        if articles is None and cache:
+            articles = cache.load(step)
+        if articles is None:
+            articles = self.fetch_articles(window[0], window[1], use_checkpoint=False)
+            articles.sort(key=self.publication_sort_key, reverse=True)
+            if self.checkpoint:
+                self.checkpoint.save_result(step, articles)
+            if cache:
+                cache.save(step, articles)
+        return articles
+    
+    def fetch_windowed(self, from_date: str, to_date: str) -> List[Dict]:
+        """Fetch the range as concurrent date windows and k-way merge them.
+        
+        Short windows keep upstream queries shallow and stable while articles are
+        being published. The windows are merged newest first by publication date,
+        de-duplicated by article id, so the order is deterministic.
+        """
+        windows = self.get_windows(from_date, to_date)
+        with ThreadPoolExecutor(max_workers=settings.FETCH_WORKERS) as executor:
+            results = list(executor.map(self.fetch_window_articles, windows))
+        print(f"Fetched {len(windows)} {self.fetch_window} windows")
+        
+        merged = []
+        seen_ids = set()
+        for article in heapq.merge(*results, key=self.publication_sort_key, reverse=True):
+            article_id = article.get('id')
+            if article_id is not None:
+                if article_id in seen_ids:
+                    continue
+                seen_ids.add(article_id)
+            merged.append(article)
+        return merged
     
     def build_url_path(self, article: Dict) -> str:
         """Build URL path from article data following the exact pattern from the sitemap."""
         # Extract category and subcategory from article data
-        category_slug = article.get('category_slug') or article.get('category', {}).get('slug', 'news')
+        category_slug = self.get_category_slug(article)
         
         # Handle subcategories - use specific subcategory slugs as in your sitemap
         subcategory_slug = article.get('subcategory_slug') or 'general'
@@ -89,26 +302,7 @@ class SitemapGenerator:
             return formatted
         
         try:
-            # Parse the datetime string
-            if 'T' in dt_string:
-                if dt_string.endswith('Z'):
-                    dt = datetime.fromisoformat(dt_string.replace('Z', '+00:00'))
-                else:
-                    # Handle various datetime formats
-                    try:
-                        dt = datetime.fromisoformat(dt_string.replace('Z', '+00:00'))
-                    except ValueError:
-                        # Try parsing with different format
-                        dt = datetime.strptime(dt_string, '%Y-%m-%dT%H:%M:%S.%f%z')
-            else:
-                # Handle date-only strings
-                dt = datetime.strptime(dt_string, '%Y-%m-%d %H:%M:%S')
-            
-            # Convert to Bangladesh timezone with exact format including microseconds
-            bd_tz = pytz.timezone('Asia/Dhaka')
-            if dt.tzinfo is None:
-                dt = pytz.utc.localize(dt)
-            dt_bd = dt.astimezone(bd_tz)
+            dt_bd = self.parse_datetime(dt_string)
             
             # Format to match exactly: 2025-06-30T23:51:20.912146+06:00
             formatted = dt_bd.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + dt_bd.strftime('%z')
@@ -128,9 +322,32 @@ class SitemapGenerator:
                 formatted = formatted[:-2] + ':' + formatted[-2:]
             return formatted
     
+    def parse_datetime(self, dt_string: str) -> datetime:
+        """Parse an API datetime string into Bangladesh time; raises ValueError/AttributeError."""
+        # Parse the datetime string
+        if 'T' in dt_string:
+            if dt_string.endswith('Z'):
+                dt = datetime.fromisoformat(dt_string.replace('Z', '+00:00'))
+            else:
+                # Handle various datetime formats
+                try:
+                    dt = datetime.fromisoformat(dt_string.replace('Z', '+00:00'))
+                except ValueError:
+                    # Try parsing with different format
+                    dt = datetime.strptime(dt_string, '%Y-%m-%dT%H:%M:%S.%f%z')
+        else:
+            # Handle date-only strings
+            dt = datetime.strptime(dt_string, '%Y-%m-%d %H:%M:%S')
+        
+        # Convert to Bangladesh timezone
+        bd_tz = pytz.timezone('Asia/Dhaka')
+        if dt.tzinfo is None:
+            dt = pytz.utc.localize(dt)
+        return dt.astimezone(bd_tz)
+    
     def get_publication_name(self, article: Dict) -> str:
         """Get exact Bengali publication name based on category as in your sitemap."""
-        category_slug = article.get('category_slug') or article.get('category', {}).get('slug', 'news')
+        category_slug = self.get_category_slug(article)
         
         # Exact mapping from your sitemap examples
         publication_map = {
@@ -157,70 +374,303 @@ class SitemapGenerator:
         """Get image caption, using title as fallback as in your sitemap."""
         return article.get('image_caption') or article.get('title', '')
     
-    def generate_sitemap(self, from_date: str, to_date: str) -> bytes:
-        """Generate sitemap XML for the given date range following exact structure."""
-        # Create root element with namespaces
+    def create_urlset(self) -> ET.Element:
+        """Create an empty <urlset> root element with the sitemap namespaces."""
         urlset = ET.Element('urlset')
         urlset.set('xmlns', 'http://www.sitemaps.org/schemas/sitemap/0.9')
         urlset.set('xmlns:news', 'http://www.google.com/schemas/sitemap-news/0.9')
         urlset.set('xmlns:image', 'http://www.google.com/schemas/sitemap-image/1.1')
-        
+        return urlset
+    
+    def render_document(self, root: ET.Element) -> bytes:
+        """Serialize a root element into the final sitemap bytes."""
         # Add XML declaration
         xml_declaration = '<?xml version="1.0" encoding="UTF-8"?>\n'
         
+        # Generate the XML with proper formatting
+        with self.stage('serialize'):
+            xml_content = self.prettify_xml(root)
+        # Combine declaration with content
+        return xml_declaration.encode('utf-8') + xml_content
+    
+    def generate_sitemap(self, from_date: str, to_date: str) -> bytes:
+        """Generate sitemap XML for the given date range following exact structure."""
+        # Create root element with namespaces
+        urlset = self.create_urlset()
+        
         # Fetch articles
-        articles = self.get_articles(from_date, to_date, page_size=50)
+        with self.stage('fetch'):
+            articles = self.fetch_range(from_date, to_date)
         print(f"Fetched {len(articles)} articles for sitemap")
         
-        for article in articles:
-            url_element = ET.SubElement(urlset, 'url')
-            
-            # Build URL - following exact pattern from your sitemap
-            url_path = self.build_url_path(article)
-            loc = f"{self.base_url}/{url_path}"
-            ET.SubElement(url_element, 'loc').text = loc
-            
-            # Last modification - handle None values
-            lastmod_dt = article.get('last_published_at') or article.get('updated_at') or article.get('created_at')
-            lastmod = self.format_datetime(lastmod_dt)
-            ET.SubElement(url_element, 'lastmod').text = lastmod
-            
-            # News markup - exact structure as in your sitemap
-            news_news = ET.SubElement(url_element, 'news:news')
+        if self.use_parallel(len(articles)):
+            with self.stage('serialize'):
+                content, _ = self.render_parallel({'all': articles})['all']
+            return content
+        
+        with self.stage('build'):
+            self.build_url_elements(urlset, articles)
+        
+        return self.render_document(urlset)
+    
+    def generate_category_sitemaps(self, from_date: str, to_date: str) -> Dict[str, Dict]:
+        """Generate one sitemap per category from a single fetch and a single pass.
+        
+        Each article is routed to its category's <urlset> as it is built.
+        Returns category slug -> {'content', 'lastmod', 'count'} in slug order.
+        """
+        with self.stage('fetch'):
+            articles = self.fetch_range(from_date, to_date)
+        print(f"Fetched {len(articles)} articles for category sitemaps")
+        
+        if self.use_parallel(len(articles)):
+            groups = {}
+            for article in articles:
+                groups.setdefault(self.get_category_key(article), []).append(article)
+            with self.stage('serialize'):
+                rendered = self.render_parallel(groups)
             
-            publication = ET.SubElement(news_news, 'news:publication')
-            publication_name = self.get_publication_name(article)
-            ET.SubElement(publication, 'news:name').text = publication_name
-            ET.SubElement(publication, 'news:language').text = 'bn'
+            results = {}
+            for category_slug in sorted(groups):
+                content, lastmod = rendered[category_slug]
+                print(f"Category {category_slug}: {len(groups[category_slug])} articles")
+                results[category_slug] = {
+                    'content': content,
+                    'lastmod': lastmod,
+                    'count': len(groups[category_slug]),
+                }
+            return results
+        
+        urlsets = {}
+        with self.stage('build'):
+            for article in articles:
+                category_slug = self.get_category_key(article)
+                if category_slug not in urlsets:
+                    urlsets[category_slug] = {'urlset': self.create_urlset(), 'lastmod': '', 'count': 0}
+                writer = urlsets[category_slug]
+                lastmod = self.build_url_element(writer['urlset'], article)
+                # All timestamps share the +06:00 format, so string order is time order
+                writer['lastmod'] = max(writer['lastmod'], lastmod)
+                writer['count'] += 1
+        
+        results = {}
+        for category_slug in sorted(urlsets):
+            writer = urlsets[category_slug]
+            print(f"Category {category_slug}: {writer['count']} articles")
+            results[category_slug] = {
+                'content': self.render_document(writer['urlset']),
+                'lastmod': writer['lastmod'],
+                'count': writer['count'],
+            }
+        return results
+    
+    def use_parallel(self, article_count: int) -> bool:
+        """Parallel rendering only pays off once there is more than one chunk of work."""
+        return self.parallel and article_count > settings.SERIALIZE_CHUNK_SIZE
+    
+    def render_chunk(self, articles: List[Dict]) -> Tuple[List[bytes], str]:
+        """Render articles as a complete pretty-printed urlset, split into lines.
+        
+        Returns the lines and the latest lastmod. The lines are: XML declaration,
+        <urlset> open tag, the <url> fragments, </urlset>, and a trailing ''.
+        """
+        urlset = self.create_urlset()
+        latest = ''
+        for article in articles:
+            latest = max(latest, self.build_url_element(urlset, article))
+        return self.prettify_xml(urlset).split(b'\n'), latest
+    
+    def render_parallel(self, groups: Dict[str, List[Dict]]) -> Dict[str, Tuple[bytes, str]]:
+        """Render each group of articles into a sitemap document using a process pool.
+        
+        Every group is cut into SERIALIZE_CHUNK_SIZE chunks. Each chunk is rendered
+        as a full urlset in a worker, and only its <url> lines are kept. Because
+        minidom indents every <url> independently, joining the fragments in order
+        between the first chunk's head and tail matches the serial output byte
+        for byte. Returns key -> (content, lastmod).
+        """
+        chunk_size = settings.SERIALIZE_CHUNK_SIZE
+        jobs = []
+        for key, articles in groups.items():
+            for start in range(0, len(articles), chunk_size):
+                jobs.append((key, articles[start:start + chunk_size]))
+        
+        workers = settings.SERIALIZE_WORKERS or None
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rendered = list(executor.map(_render_chunk, [chunk for _, chunk in jobs]))
+        print(f"Rendered {len(jobs)} chunks in parallel")
+        
+        chunks_by_key = {}
+        for (key, _), result in zip(jobs, rendered):
+            chunks_by_key.setdefault(key, []).append(result)
+        
+        xml_declaration = '<?xml version="1.0" encoding="UTF-8"?>\n'.encode('utf-8')
+        results = {}
+        for key, chunks in chunks_by_key.items():
+            first_lines = chunks[0][0]
+            lines = list(first_lines[:2])
+            for chunk_lines, _ in chunks:
+                lines.extend(chunk_lines[2:-2])
+            lines.extend(first_lines[-2:])
+            latest = max(chunk_lastmod for _, chunk_lastmod in chunks)
+            results[key] = (xml_declaration + b'\n'.join(lines), latest)
+        return results
+    
+    def compact_record(self, article: Dict) -> Dict:
+        """Reduce an API article to the fields needed to render its <url> element."""
+        record = {field: article[field] for field in COMPACT_FIELDS if field in article}
+        if isinstance(record.get('category'), dict):
+            record['category'] = {'slug': record['category'].get('slug', 'news')}
+        if record.get('subcategories'):
+            record['subcategories'] = record['subcategories'][:1]
+        return record
+    
+    def new_external_sorter(self) -> ExternalSorter:
+        """External sorter with the configured memory cap, ordering keys descending."""
+        return ExternalSorter(settings.EXTERNAL_SORT_MEMORY_MB * 1024 * 1024,
+                              tmp_dir=settings.EXTERNAL_SORT_TMP_DIR, reverse=True)
+    
+    def iter_source_articles(self, from_date: str, to_date: str) -> Iterator[Dict]:
+        """Yield the range's articles one page (or one date window) at a time."""
+        if self.fetch_window:
+            # Windows are fetched one after another so only one is held in memory
+            for window in self.get_windows(from_date, to_date):
+                yield from self.fetch_window_articles(window)
+            return
+        
+        for batch in self.iter_article_pages(from_date, to_date):
+            yield from batch
+    
+    def spill_articles(self, from_date: str, to_date: str, sorter: ExternalSorter) -> int:
+        """Feed the range into sorter keyed newest first by (publication date, <loc>).
+        
+        A first on-disk pass sorts by (<loc>, publication date) so every copy of
+        a URL is adjacent and only the newest is passed on, even when the copies
+        carry different dates. The first pass releases each record as it hands
+        it on, so both passes together stay within one memory budget. Returns
+        the number of articles fetched.
+        """
+        with self.new_external_sorter() as by_loc:
+            for article in self.iter_source_articles(from_date, to_date):
+                loc = f"{self.base_url}/{self.build_url_path(article)}"
+                by_loc.add([loc, self.publication_sort_key(article)[0]], self.compact_record(article))
             
-            # Publication date - handle None values
-            pub_date = article.get('published_at') or article.get('created_at')
-            publication_date = self.format_datetime(pub_date)
-            ET.SubElement(news_news, 'news:publication_date').text = publication_date
+            last_loc = None
+            for (loc, sort_date), record in by_loc.sorted_items():
+                if loc == last_loc:
+                    continue
+                last_loc = loc
+                sorter.add([sort_date, loc], record)
             
-            news_title = article.get('title', '')
-            ET.SubElement(news_news, 'news:title').text = news_title
-            ET.SubElement(news_news, 'news:keywords')  # Empty keywords as in your sitemap
+            duplicates = by_loc.count - sorter.count
+            if duplicates:
+                print(f"Dropped {duplicates} duplicate URLs")
+            return by_loc.count
+    
+    def write_sitemap_external(self, from_date: str, to_date: str, path: str) -> Dict:
+        """Write the sitemap for a date range to path with bounded memory.
+        
+        Records are de-duplicated and sorted newest first on disk, then streamed
+        into the file, so memory use does not grow with the number of URLs.
+        """
+        with self.new_external_sorter() as sorter:
+            with self.stage('fetch'):
+                fetched = self.spill_articles(from_date, to_date, sorter)
+            print(f"Fetched {fetched} articles for sitemap")
             
-            # Image markup - exact structure
-            image_url = self.get_image_url(article)
-            if image_url:
-                image_image = ET.SubElement(url_element, 'image:image')
-                ET.SubElement(image_image, 'image:loc').text = image_url
-                image_caption = self.get_image_caption(article)
-                ET.SubElement(image_image, 'image:caption').text = image_caption
+            with self.stage('serialize'):
+                with StreamingSitemapWriter(self, path) as writer:
+                    for _, record in sorter.sorted_items():
+                        writer.write(record)
+                    return writer.close()
+    
+    def write_category_sitemaps_external(self, from_date: str, to_date: str,
+                                         path_for: Callable[[str], str]) -> Dict[str, Dict]:
+        """Write one sitemap per category with bounded memory, routing each sorted record to its writer."""
+        with self.new_external_sorter() as sorter:
+            with self.stage('fetch'):
+                fetched = self.spill_articles(from_date, to_date, sorter)
+            print(f"Fetched {fetched} articles for category sitemaps")
             
-            # SEO elements - exactly as in your sitemap
-            ET.SubElement(url_element, 'changefreq').text = settings.CHANGE_FREQ
-            ET.SubElement(url_element, 'priority').text = settings.PRIORITY
+            writers = {}
+            with self.stage('serialize'), ExitStack() as stack:
+                for _, record in sorter.sorted_items():
+                    category_slug = self.get_category_key(record)
+                    if category_slug not in writers:
+                        writers[category_slug] = stack.enter_context(
+                            StreamingSitemapWriter(self, path_for(category_slug))
+                        )
+                    writers[category_slug].write(record)
+                
+                results = {}
+                for category_slug in sorted(writers):
+                    results[category_slug] = writers[category_slug].close()
+                    print(f"Category {category_slug}: {results[category_slug]['count']} articles")
+                return results
+    
+    def generate_sitemap_index(self, entries: List[Tuple[str, str]]) -> bytes:
+        """Generate a <sitemapindex> document from (loc, lastmod) pairs."""
+        sitemapindex = ET.Element('sitemapindex')
+        sitemapindex.set('xmlns', 'http://www.sitemaps.org/schemas/sitemap/0.9')
+        for loc, lastmod in entries:
+            sitemap = ET.SubElement(sitemapindex, 'sitemap')
+            ET.SubElement(sitemap, 'loc').text = loc
+            if lastmod:
+                ET.SubElement(sitemap, 'lastmod').text = lastmod
+        return self.render_document(sitemapindex)
+    
+    def build_url_elements(self, urlset: ET.Element, articles: List[Dict]):
+        """Append a <url> element to urlset for each article."""
+        for article in articles:
+            self.build_url_element(urlset, article)
+    
+    def build_url_element(self, urlset: ET.Element, article: Dict) -> str:
+        """Append the <url> element for one article and return its lastmod."""
+        url_element = ET.SubElement(urlset, 'url')
         
-        # Generate the XML with proper formatting
-        xml_content = self.prettify_xml(urlset)
-        # Combine declaration with content
-        return xml_declaration.encode('utf-8') + xml_content
+        # Build URL - following exact pattern from your sitemap
+        url_path = self.build_url_path(article)
+        loc = f"{self.base_url}/{url_path}"
+        ET.SubElement(url_element, 'loc').text = loc
+        
+        # Last modification - handle None values
+        lastmod_dt = article.get('last_published_at') or article.get('updated_at') or article.get('created_at')
+        lastmod = self.format_datetime(lastmod_dt)
+        ET.SubElement(url_element, 'lastmod').text = lastmod
+        
+        # News markup - exact structure as in your sitemap
+        news_news = ET.SubElement(url_element, 'news:news')
+        
+        publication = ET.SubElement(news_news, 'news:publication')
+        publication_name = self.get_publication_name(article)
+        ET.SubElement(publication, 'news:name').text = publication_name
+        ET.SubElement(publication, 'news:language').text = 'bn'
+        
+        # Publication date - handle None values
+        pub_date = article.get('published_at') or article.get('created_at')
+        publication_date = self.format_datetime(pub_date)
+        ET.SubElement(news_news, 'news:publication_date').text = publication_date
+        
+        news_title = article.get('title', '')
+        ET.SubElement(news_news, 'news:title').text = news_title
+        ET.SubElement(news_news, 'news:keywords')  # Empty keywords as in your sitemap
+        
+        # Image markup - exact structure
+        image_url = self.get_image_url(article)
+        if image_url:
+            image_image = ET.SubElement(url_element, 'image:image')
+            ET.SubElement(image_image, 'image:loc').text = image_url
+            image_caption = self.get_image_caption(article)
+            ET.SubElement(image_image, 'image:caption').text = image_caption
+        
+        # SEO elements - exactly as in your sitemap
+        ET.SubElement(url_element, 'changefreq').text = settings.CHANGE_FREQ
+        ET.SubElement(url_element, 'priority').text = settings.PRIORITY
+        
+        return lastmod
     
-    def generate_monthly_sitemap(self, year: int, month: int) -> bytes:
-        """Generate sitemap for a specific month."""
+    def get_month_range(self, year: int, month: int) -> Tuple[str, str]:
+        """Return the (from_date, to_date) strings covering a calendar month."""
         from_date = f"{year}-{month:02d}-01"
         
         # Calculate last day of month
@@ -230,6 +680,103 @@ class SitemapGenerator:
             next_month = datetime(year, month + 1, 1)
         last_day = next_month - timedelta(days=1)
         to_date = last_day.strftime('%Y-%m-%d')
+        return from_date, to_date
+    
+    def generate_monthly_sitemap(self, year: int, month: int) -> bytes:
+        """Generate sitemap for a specific month."""
+        from_date, to_date = self.get_month_range(year, month)
         
         print(f"Generating sitemap for {from_date} to {to_date}")
         return self.generate_sitemap(from_date, to_date)
+    
+    def generate_monthly_category_sitemaps(self, year: int, month: int) -> Dict[str, Dict]:
+        """Generate per-category sitemaps for a specific month."""
+        from_date, to_date = self.get_month_range(year, month)
+        
+        print(f"Generating category sitemaps for {from_date} to {to_date}")
+        return self.generate_category_sitemaps(from_date, to_date)
+    
+    def write_monthly_sitemap_external(self, year: int, month: int, path: str) -> Dict:
+        """Write the sitemap for a specific month using the external sort."""
+        from_date, to_date = self.get_month_range(year, month)
+        
+        print(f"Generating sitemap for {from_date} to {to_date} (external sort)")
+        return self.write_sitemap_external(from_date, to_date, path)
+    
+    def write_monthly_category_sitemaps_external(self, year: int, month: int,
+                                                 path_for: Callable[[str], str]) -> Dict[str, Dict]:
+        """Write per-category sitemaps for a specific month using the external sort."""
+        from_date, to_date = self.get_month_range(year, month)
+        
+        print(f"Generating category sitemaps for {from_date} to {to_date} (external sort)")
+        return self.write_category_sitemaps_external(from_date, to_date, path_for)
+
+
+class StreamingSitemapWriter:
+    """Write a sitemap file incrementally in the same format as render_document.
+    
+    Records are rendered in small batches with SitemapGenerator.render_chunk.
+    Only the <url> lines of each batch are appended, so a file of any size is
+    written with memory proportional to one batch. The file is written under a
+    temporary name and moved into place on close(); used as a context manager,
+    the partial file is removed if an error occurs before then.
+    """
+    
+    def __init__(self, generator: SitemapGenerator, path: str):
+        self.generator = generator
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.file = open(self.tmp_path, 'wb')
+        self.batch: List[Dict] = []
+        self.tail: Optional[List[bytes]] = None
+        self.lastmod = ''
+        self.count = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.abort()
+    
+    def abort(self):
+        """Close and delete the partially written file."""
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+    
+    def write(self, record: Dict):
+        self.batch.append(record)
+        self.count += 1
+        if len(self.batch) >= settings.EXTERNAL_SORT_WRITE_BATCH:
+            self._flush()
+    
+    def _flush(self):
+        if not self.batch:
+            return
+        lines, lastmod = self.generator.render_chunk(self.batch)
+        self.lastmod = max(self.lastmod, lastmod)
+        if self.tail is None:
+            # The first batch supplies the XML declarations and <urlset> open tag
+            self.file.write('<?xml version="1.0" encoding="UTF-8"?>\n'.encode('utf-8'))
+            self.file.write(b'\n'.join(lines[:2]) + b'\n')
+            self.tail = lines[-2:]
+        self.file.write(b'\n'.join(lines[2:-2]) + b'\n')
+        self.batch = []
+    
+    def close(self) -> Dict:
+        """Finish the document and return {'path', 'lastmod', 'count'}."""
+        self._flush()
+        if self.tail is None:
+            # No records: match the serial output for an empty <urlset/>
+            self.file.write(self.generator.render_document(self.generator.create_urlset()))
+        else:
+            self.file.write(b'\n'.join(self.tail))
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+        return {'path': self.path, 'lastmod': self.lastmod, 'count': self.count}
+
+
+def _render_chunk(articles: List[Dict]) -> Tuple[List[bytes], str]:
+    """Process pool entry point; must live at module level to be picklable."""
+    return SitemapGenerator().render_chunk(articles)
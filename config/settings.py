@@ -21,8 +21,56 @@ R2_ENDPOINT_URL = r2_endpoint
 # Sitemap Configuration
 SITEMAP_FILENAME = os.getenv('SITEMAP_FILENAME', "sitemap-monthly-{year}-{month:02d}.xml")
 SITEMAP_FOLDER = os.getenv('SITEMAP_FOLDER', "sitemaps/")
+SITEMAP_LOCAL_DIR = os.getenv('SITEMAP_LOCAL_DIR', "/app/sitemaps")
+# Per-category sitemaps (--by-category) and the index that lists them
+CATEGORY_SITEMAP_FILENAME = os.getenv('CATEGORY_SITEMAP_FILENAME', "sitemap-{category}-{year}-{month:02d}.xml")
+SITEMAP_INDEX_FILENAME = os.getenv('SITEMAP_INDEX_FILENAME', "sitemap-index-{year}-{month:02d}.xml")
+# Public URL of the bucket (required for --by-category); index <loc>s are
+# this URL followed by the object key, including SITEMAP_FOLDER
+SITEMAP_BASE_URL = os.getenv('SITEMAP_BASE_URL')
 CHANGE_FREQ = os.getenv('CHANGE_FREQ', "daily")
 PRIORITY = os.getenv('PRIORITY', "0.8")
 
 # API Pagination
 PAGE_SIZE = int(os.getenv('PAGE_SIZE', '5000'))
+
+# Windowed fetching (--windowed): 'day' or 'hour' windows fetched concurrently
+FETCH_WINDOW = os.getenv('FETCH_WINDOW', 'day')
+FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', '4'))
+# Windows that ended before yesterday are reused by later runs for this many
+# seconds (0 disables the cache; edits to older articles show up once it expires)
+WINDOW_CACHE_TTL_SECONDS = float(os.getenv('WINDOW_CACHE_TTL_SECONDS', '0'))
+
+# Bucket Sync
+SYNC_WORKERS = int(os.getenv('SYNC_WORKERS', '8'))
+SYNC_DELETE_ORPHANS = os.getenv('SYNC_DELETE_ORPHANS', 'true').lower() == 'true'
+
+# Profiling (enabled per run with --profile)
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(SITEMAP_LOCAL_DIR, 'profiles'))
+PROFILE_TOP_N = int(os.getenv('PROFILE_TOP_N', '15'))
+
+# Checkpoints (kept only until a run completes; reused with --resume)
+CHECKPOINT_DIR = os.getenv('CHECKPOINT_DIR', os.path.join(SITEMAP_LOCAL_DIR, '.checkpoints'))
+WINDOW_CACHE_DIR = os.getenv('WINDOW_CACHE_DIR', os.path.join(SITEMAP_LOCAL_DIR, '.window-cache'))
+
+# Parallel serialization (--parallel); 0 workers means one per CPU core
+SERIALIZE_WORKERS = int(os.getenv('SERIALIZE_WORKERS', '0'))
+SERIALIZE_CHUNK_SIZE = int(os.getenv('SERIALIZE_CHUNK_SIZE', '2000'))
+
+# Event ingest endpoint (python -m app.main serve)
+# Binding anywhere other than loopback requires INGEST_TOKEN
+INGEST_HOST = os.getenv('INGEST_HOST', "127.0.0.1")
+INGEST_PORT = int(os.getenv('INGEST_PORT', '8080'))
+INGEST_TOKEN = os.getenv('INGEST_TOKEN')
+INGEST_DEBOUNCE_SECONDS = float(os.getenv('INGEST_DEBOUNCE_SECONDS', '5'))
+INGEST_MAX_DELAY_SECONDS = float(os.getenv('INGEST_MAX_DELAY_SECONDS', '60'))
+# Failed rebuilds back off exponentially from INGEST_DEBOUNCE_SECONDS
+INGEST_MAX_ATTEMPTS = int(os.getenv('INGEST_MAX_ATTEMPTS', '5'))
+INGEST_RETRY_MAX_DELAY_SECONDS = float(os.getenv('INGEST_RETRY_MAX_DELAY_SECONDS', '600'))
+
+# External sort (--external-sort): memory cap for the records buffered across
+# the whole run before they are spilled to sorted runs on disk, and <url>
+# elements rendered per write
+EXTERNAL_SORT_MEMORY_MB = int(os.getenv('EXTERNAL_SORT_MEMORY_MB', '64'))
+EXTERNAL_SORT_TMP_DIR = os.getenv('EXTERNAL_SORT_TMP_DIR') or None
+EXTERNAL_SORT_WRITE_BATCH = int(os.getenv('EXTERNAL_SORT_WRITE_BATCH', '500'))